@@ -2,22 +2,52 @@
 FastAPI Application for PDF RAG System
 Provides endpoints for PDF upload, processing, and chat functionality
 """
-from fastapi import FastAPI, File, UploadFile, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+import asyncio
 import os
-import shutil
+import tempfile
+import aiofiles
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from typing import Optional
 from pdf_processor import PDFProcessor
 from chat_engine import ChatEngine
 
+# Thread pool for blocking work (PDF parsing, embeddings, Chroma, LLM calls)
+EXECUTOR = ThreadPoolExecutor(max_workers=16)
+
+
+# Processors are created at startup rather than at import time: extraction
+# worker processes re-import this module as __mp_main__, and must not load
+# models or open the vector store when they do
+pdf_processor: Optional[PDFProcessor] = None
+chat_engine: Optional[ChatEngine] = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the processors and run asyncio.to_thread calls on the shared thread pool"""
+    global pdf_processor, chat_engine
+    asyncio.get_running_loop().set_default_executor(EXECUTOR)
+    
+    # Initialize processors
+    pdf_processor = PDFProcessor()
+    chat_engine = ChatEngine()
+    yield
+    EXECUTOR.shutdown(wait=False)
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="PDF RAG System",
     description="Upload PDFs and chat with your documents using AI",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -32,19 +62,21 @@ app.add_middleware(
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-# Initialize processors
-pdf_processor = PDFProcessor()
-chat_engine = ChatEngine()
-
 # Create uploads directory if it doesn't exist
 UPLOAD_DIR = "uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+# Uploads are copied to disk in 1 MB pieces
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Most chunks a chat request may retrieve (all of them go into the prompt)
+MAX_CHAT_K = 20
+
 
 # Pydantic models for request/response
 class ChatRequest(BaseModel):
     question: str
-    k: Optional[int] = 5
+    k: int = Field(5, ge=1, le=MAX_CHAT_K)
 
 
 class ChatResponse(BaseModel):
@@ -54,6 +86,18 @@ class ChatResponse(BaseModel):
     num_sources: Optional[int] = 0
 
 
+def _new_upload_path() -> str:
+    """Create an empty, uniquely named file in the uploads directory"""
+    with tempfile.NamedTemporaryFile(dir=UPLOAD_DIR, suffix=".pdf", delete=False) as upload:
+        return upload.name
+
+
+def _remove_upload(file_path: str):
+    """Delete a temporary upload if it is still on disk"""
+    if os.path.exists(file_path):
+        os.remove(file_path)
+
+
 @app.get("/")
 async def root():
     """Redirect to static index.html"""
@@ -62,7 +106,7 @@ async def root():
 
 
 @app.post("/upload-pdf")
-async def upload_pdf(file: UploadFile = File(...)):
+async def upload_pdf(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
     """
     Upload and process a PDF file
     
@@ -75,43 +119,46 @@ async def upload_pdf(file: UploadFile = File(...)):
     if not file.filename.endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Only PDF files are allowed")
     
-    # Save uploaded file
-    file_path = os.path.join(UPLOAD_DIR, file.filename)
-    try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error saving file: {str(e)}")
-    
-    # Process PDF
+    # Save uploaded file under a unique server-side name; the client's
+    # filename is only used as the document's source label
+    file_path = await asyncio.to_thread(_new_upload_path)
     try:
-        # Reinitialize processors to ensure clean state
-        global pdf_processor, chat_engine
-        pdf_processor = PDFProcessor()
+        try:
+            async with aiofiles.open(file_path, "wb") as buffer:
+                while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                    await buffer.write(chunk)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error saving file: {str(e)}")
         
-        result = pdf_processor.process_pdf(file_path, file.filename)
+        # Process PDF
+        try:
+            result = await asyncio.to_thread(pdf_processor.process_pdf, file_path, file.filename)
+            
+            if result["success"]:
+                # Clean up uploaded file after the response has been sent
+                background_tasks.add_task(_remove_upload, file_path)
+                return ORJSONResponse(content={
+                    "success": True,
+                    "message": result["message"],
+                    "filename": result["filename"],
+                    "chunks_created": result["chunks_created"],
+                    "total_documents": result["total_documents"]
+                })
+            else:
+                raise HTTPException(status_code=500, detail=result["message"])
         
-        # Reinitialize chat engine to load new documents
-        chat_engine = ChatEngine()
-        
-        if result["success"]:
-            return JSONResponse(content={
-                "success": True,
-                "message": result["message"],
-                "filename": result["filename"],
-                "chunks_created": result["chunks_created"],
-                "total_documents": result["total_documents"]
-            })
-        else:
-            raise HTTPException(status_code=500, detail=result["message"])
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error processing PDF: {str(e)}")
     
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error processing PDF: {str(e)}")
+    except asyncio.CancelledError:
+        # Nothing can be awaited once cancelled, so clean up inline
+        _remove_upload(file_path)
+        raise
     
-    finally:
-        # Clean up uploaded file
-        if os.path.exists(file_path):
-            os.remove(file_path)
+    except Exception:
+        # Clean up uploaded file before reporting the error
+        await asyncio.to_thread(_remove_upload, file_path)
+        raise
 
 
 @app.post("/chat", response_model=ChatResponse)
@@ -124,7 +171,7 @@ async def chat(request: ChatRequest):
     - Generates AI-powered answer
     """
     try:
-        result = chat_engine.chat(request.question, request.k)
+        result = await asyncio.to_thread(chat_engine.chat, request.question, request.k)
         return ChatResponse(**result)
     
     except Exception as e:
@@ -139,8 +186,8 @@ async def get_status():
     Returns information about stored documents
     """
     try:
-        status = pdf_processor.get_vectorstore_status()
-        return JSONResponse(content=status)
+        status = await asyncio.to_thread(pdf_processor.get_vectorstore_status)
+        return ORJSONResponse(content=status)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting status: {str(e)}")
@@ -151,19 +198,17 @@ async def clear_vectorstore():
     """
     Clear all documents from the vector store
     
-    WARNING: This will delete all uploaded PDFs and their embeddings
+    WARNING: This will delete all uploaded PDFs and their embeddings,
+    including the cached embeddings in db/embed_cache
     """
-    global pdf_processor, chat_engine
-    
     try:
-        result = pdf_processor.clear_vectorstore()
+        result = await asyncio.to_thread(pdf_processor.clear_vectorstore)
         
-        # Reinitialize processors
-        pdf_processor = PDFProcessor()
-        chat_engine = ChatEngine()
+        # Drop the chat engine's handle to the cleared store
+        chat_engine.reset_vectorstore()
         
         if result["success"]:
-            return JSONResponse(content={
+            return ORJSONResponse(content={
                 "success": True,
                 "message": result["message"]
             })
@@ -186,7 +231,7 @@ async def get_provider_info():
     try:
         from llm_config import get_provider_info
         info = get_provider_info()
-        return JSONResponse(content=info)
+        return ORJSONResponse(content=info)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting provider info: {str(e)}")
 
@@ -2,15 +2,39 @@
 Chat Engine Module
 Handles querying the vector database and generating AI responses
 """
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import threading
+import numpy as np
 from langchain_chroma import Chroma
 from langchain_core.messages import HumanMessage, SystemMessage
 from dotenv import load_dotenv
 from llm_config import get_embeddings, get_llm
+from vectorstore_config import COLLECTION_METADATA, get_client_settings, get_corpus_generation, prefetch_index_files
 import os
 
 load_dotenv()
 
+# Corpora up to this many chunks are searched with an exact in-memory matmul
+# instead of the HNSW index
+FLAT_INDEX_MAX_CHUNKS = 50_000
+
+# Store the flat index as int8 (4x smaller) instead of float32
+FLAT_INDEX_QUANTIZE = os.getenv("FLAT_INDEX_QUANTIZE", "false").lower() == "true"
+
+# Rows of the int8 index dequantized per step during a search
+QUANTIZED_SEARCH_BLOCK = 8192
+
+# Semantic answer cache: a question whose embedding is this similar to a
+# previously answered one (with the same k) reuses that answer
+ANSWER_CACHE_SIZE = 256
+ANSWER_CACHE_THRESHOLD = 0.97
+
+
+def _unit_vector(embedding: List[float]) -> np.ndarray:
+    """Convert an embedding to a normalized float32 vector"""
+    vector = np.asarray(embedding, dtype=np.float32)
+    return vector / (np.linalg.norm(vector) or 1.0)
+
 
 class ChatEngine:
     def __init__(self, persist_directory: str = "db/chroma_db"):
@@ -19,47 +43,192 @@ class ChatEngine:
         self.embedding_model = get_embeddings()
         self.llm = get_llm(temperature=0.7)
         
+        # In-memory copy of the collection for brute-force search
+        self._flat_index = None
+        self._flat_index_lock = threading.Lock()
+        
+        # Recently answered questions as (embedding, k, result), oldest first
+        self._answer_cache = []
+        self._answer_cache_matrix = None
+        self._answer_cache_generation = None
+        self._answer_cache_lock = threading.Lock()
+        
         # Load vector store if it exists
-        if os.path.exists(persist_directory):
+        self.vectorstore = None
+        self._get_vectorstore()
+    
+    def _get_vectorstore(self):
+        """Open the vector store once documents have been persisted"""
+        if self.vectorstore is None and os.path.exists(self.persist_directory):
+            prefetch_index_files(self.persist_directory)
             self.vectorstore = Chroma(
-                persist_directory=persist_directory,
+                persist_directory=self.persist_directory,
                 embedding_function=self.embedding_model,
-                collection_metadata={"hnsw:space": "cosine"}
+                collection_metadata=COLLECTION_METADATA,
+                client_settings=get_client_settings(self.persist_directory)
             )
+        return self.vectorstore
+    
+    def reset_vectorstore(self):
+        """Drop the vector store handle, e.g. after the store was cleared"""
+        self.vectorstore = None
+        self._flat_index = None
+        with self._answer_cache_lock:
+            self._answer_cache.clear()
+            self._answer_cache_matrix = None
+    
+    def _lookup_cached_answer(self, query: np.ndarray, k: int, generation: int) -> Optional[Dict[str, Any]]:
+        """
+        Find a cached answer for a semantically equivalent question
+        
+        Args:
+            query: Normalized question embedding
+            k: Number of chunks the answer should be based on
+            generation: Current corpus generation; the cache is dropped when it changes
+            
+        Returns:
+            The cached chat result, or None on a miss
+        """
+        with self._answer_cache_lock:
+            if self._answer_cache_generation != generation:
+                self._answer_cache.clear()
+                self._answer_cache_matrix = None
+                self._answer_cache_generation = generation
+                return None
+            if not self._answer_cache:
+                return None
+            
+            if self._answer_cache_matrix is None:
+                self._answer_cache_matrix = np.stack([entry[0] for entry in self._answer_cache])
+            scores = self._answer_cache_matrix @ query
+            
+            # Only answers built from the same number of chunks are reusable
+            scores[[entry[1] != k for entry in self._answer_cache]] = -1.0
+            best = int(np.argmax(scores))
+            if scores[best] < ANSWER_CACHE_THRESHOLD:
+                return None
+            
+            # Move the hit to the most recently used end
+            entry = self._answer_cache.pop(best)
+            self._answer_cache.append(entry)
+            self._answer_cache_matrix = None
+            return entry[2]
+    
+    def _cache_answer(self, query: np.ndarray, k: int, generation: int, result: Dict[str, Any]):
+        """Remember an answer, evicting the least recently used entry when full"""
+        with self._answer_cache_lock:
+            if self._answer_cache_generation != generation:
+                return  # The documents changed while this answer was generated
+            self._answer_cache.append((query, k, result))
+            if len(self._answer_cache) > ANSWER_CACHE_SIZE:
+                self._answer_cache.pop(0)
+            self._answer_cache_matrix = None
+    
+    def _get_flat_index(self, vectorstore: Chroma) -> Optional[Dict[str, Any]]:
+        """
+        Get the normalized embedding matrix for brute-force search
+        
+        The matrix is rebuilt when the corpus generation changes, i.e. after
+        an ingest or clear has finished, never midway through an ingest.
+        
+        Returns:
+            Dictionary with embeddings, documents and metadatas, or None if
+            the collection is empty or too large for a flat search
+        """
+        count = vectorstore._collection.count()
+        if count == 0 or count > FLAT_INDEX_MAX_CHUNKS:
+            return None
+        
+        with self._flat_index_lock:
+            generation = get_corpus_generation()
+            if self._flat_index is None or self._flat_index["generation"] != generation:
+                data = vectorstore._collection.get(include=["embeddings", "documents", "metadatas"])
+                embeddings = np.array(data["embeddings"], dtype=np.float32)
+                norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+                embeddings /= np.where(norms == 0, 1, norms)
+                
+                scale = None
+                if FLAT_INDEX_QUANTIZE:
+                    # Per-dimension symmetric int8 quantization
+                    scale = np.max(np.abs(embeddings), axis=0) / 127
+                    scale[scale == 0] = 1
+                    embeddings = np.round(embeddings / scale).astype(np.int8)
+                
+                self._flat_index = {
+                    "generation": generation,
+                    "embeddings": embeddings,
+                    "scale": scale,
+                    "documents": data["documents"],
+                    "metadatas": data["metadatas"]
+                }
+            return self._flat_index
+    
+    def _flat_search(self, flat_index: Dict[str, Any], query_embedding: List[float], k: int) -> List[tuple]:
+        """Cosine search over all chunks with one matrix-vector product"""
+        if k <= 0:
+            return []
+        
+        query = _unit_vector(query_embedding)
+        
+        embeddings, scale = flat_index["embeddings"], flat_index["scale"]
+        if scale is None:
+            scores = embeddings @ query
         else:
-            self.vectorstore = None
+            # x . q == x_q8 . (scale * q); dequantize a block at a time so the
+            # float32 copy stays cache-sized and the matmul still uses BLAS
+            weights = scale * query
+            scores = np.empty(len(embeddings), dtype=np.float32)
+            for start in range(0, len(embeddings), QUANTIZED_SEARCH_BLOCK):
+                block = embeddings[start:start + QUANTIZED_SEARCH_BLOCK]
+                scores[start:start + len(block)] = block.astype(np.float32) @ weights
+        
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(flat_index["documents"][i], flat_index["metadatas"][i]) for i in top]
     
-    def query_vectordb(self, question: str, k: int = 5) -> List[Dict[str, Any]]:
+    def query_vectordb(self, question: str, k: int = 5, query_embedding: Optional[List[float]] = None) -> List[Dict[str, Any]]:
         """
         Retrieve relevant chunks from vector database
         
         Args:
             question: User's question
             k: Number of relevant chunks to retrieve
+            query_embedding: Precomputed embedding of the question, if available
             
         Returns:
             List of relevant document chunks with metadata
         """
-        if self.vectorstore is None:
+        vectorstore = self._get_vectorstore()
+        if vectorstore is None:
             return []
         
         try:
-            # Create retriever
-            retriever = self.vectorstore.as_retriever(
-                search_kwargs={"k": k}
-            )
+            if query_embedding is None:
+                query_embedding = self.embedding_model.embed_query(question)
             
-            # Retrieve relevant documents
-            relevant_docs = retriever.invoke(question)
+            flat_index = self._get_flat_index(vectorstore)
+            if flat_index is not None:
+                # Small corpus: exact search over the in-memory matrix
+                hits = self._flat_search(flat_index, query_embedding, k)
+            else:
+                # Query the collection directly instead of building a retriever
+                # and Document objects on every call
+                response = vectorstore._collection.query(
+                    query_embeddings=[query_embedding],
+                    n_results=k,
+                    include=["documents", "metadatas"]
+                )
+                hits = zip(response["documents"][0], response["metadatas"][0])
             
             # Format results
             results = [
                 {
-                    "content": doc.page_content,
-                    "source": doc.metadata.get("source", "Unknown"),
-                    "chunk_index": doc.metadata.get("chunk_index", 0)
+                    "content": content,
+                    "source": (metadata or {}).get("source", "Unknown"),
+                    "chunk_index": (metadata or {}).get("chunk_index", 0)
                 }
-                for doc in relevant_docs
+                for content, metadata in hits
             ]
             
             return results
@@ -68,26 +237,23 @@ class ChatEngine:
             print(f"Error querying vector database: {str(e)}")
             return []
     
-    def generate_answer(self, question: str, context_docs: List[Dict[str, Any]]) -> str:
+    def generate_answer(self, question: str, context: str) -> str:
         """
         Generate answer using LLM based on retrieved context
         
         Args:
             question: User's question
-            context_docs: List of relevant document chunks
+            context: Retrieved document chunks, formatted with source headers
             
         Returns:
             Generated answer as a string
+            
+        Raises:
+            Exception: If the LLM call fails
         """
-        if not context_docs:
+        if not context:
             return "I don't have any information to answer that question. Please upload a PDF document first."
         
-        # Format context from retrieved documents
-        context = "\n\n".join([
-            f"[Source: {doc['source']}, Chunk {doc['chunk_index']}]\n{doc['content']}"
-            for doc in context_docs
-        ])
-        
         # Create prompt
         prompt = f"""Based on the following documents, please answer this question: {question}
 
@@ -99,17 +265,13 @@ Please provide a clear, helpful answer using only the information from these doc
 Include specific references to the source documents when relevant."""
         
         # Generate response
-        try:
-            messages = [
-                SystemMessage(content="You are a helpful AI assistant that answers questions based on provided PDF documents. Always cite your sources and be accurate."),
-                HumanMessage(content=prompt)
-            ]
-            
-            result = self.llm.invoke(messages)
-            return result.content
+        messages = [
+            SystemMessage(content="You are a helpful AI assistant that answers questions based on provided PDF documents. Always cite your sources and be accurate."),
+            HumanMessage(content=prompt)
+        ]
         
-        except Exception as e:
-            return f"Error generating answer: {str(e)}"
+        result = self.llm.invoke(messages)
+        return result.content
     
     def chat(self, question: str, k: int = 5) -> Dict[str, Any]:
         """
@@ -122,7 +284,15 @@ Include specific references to the source documents when relevant."""
         Returns:
             Dictionary with answer and source information
         """
-        if self.vectorstore is None:
+        try:
+            vectorstore = self._get_vectorstore()
+            corpus_size = vectorstore._collection.count() if vectorstore is not None else 0
+        except Exception as e:
+            # e.g. /clear reset the store while this request held the old handle
+            print(f"Error reading vector store: {str(e)}")
+            corpus_size = 0
+        
+        if corpus_size == 0:
             return {
                 "success": False,
                 "answer": "No documents have been uploaded yet. Please upload a PDF document first.",
@@ -130,8 +300,17 @@ Include specific references to the source documents when relevant."""
             }
         
         try:
+            # Step 0: Reuse the answer to a near-identical earlier question
+            # Embed the question once for both the cache and retrieval
+            query_embedding = self.embedding_model.embed_query(question)
+            query = _unit_vector(query_embedding)
+            generation = get_corpus_generation()
+            cached = self._lookup_cached_answer(query, k, generation)
+            if cached is not None:
+                return cached
+            
             # Step 1: Retrieve relevant context
-            context_docs = self.query_vectordb(question, k)
+            context_docs = self.query_vectordb(question, k, query_embedding=query_embedding)
             
             if not context_docs:
                 return {
@@ -140,25 +319,38 @@ Include specific references to the source documents when relevant."""
                     "sources": []
                 }
             
-            # Step 2: Generate answer
-            answer = self.generate_answer(question, context_docs)
+            # Step 2: Format prompt context and sources in one pass
+            context_parts, sources = [], []
+            for doc in context_docs:
+                source, chunk_index, content = doc["source"], doc["chunk_index"], doc["content"]
+                context_parts.append(f"[Source: {source}, Chunk {chunk_index}]\n{content}")
+                sources.append({
+                    "source": source,
+                    "chunk_index": chunk_index,
+                    "preview": content[:200] + "..." if len(content) > 200 else content
+                })
             
-            # Step 3: Format sources
-            sources = [
-                {
-                    "source": doc["source"],
-                    "chunk_index": doc["chunk_index"],
-                    "preview": doc["content"][:200] + "..." if len(doc["content"]) > 200 else doc["content"]
+            # Step 3: Generate answer
+            try:
+                answer = self.generate_answer(question, "\n\n".join(context_parts))
+            except Exception as e:
+                # Report LLM failures with the sources, but never cache them
+                return {
+                    "success": True,
+                    "answer": f"Error generating answer: {str(e)}",
+                    "sources": sources,
+                    "num_sources": len(sources)
                 }
-                for doc in context_docs
-            ]
             
-            return {
+            result = {
                 "success": True,
                 "answer": answer,
                 "sources": sources,
                 "num_sources": len(sources)
             }
+            self._cache_answer(query, k, generation, result)
+            
+            return result
         
         except Exception as e:
             return {
@@ -3,20 +3,41 @@ LLM Configuration Module
 Handles initialization of different LLM providers based on environment variables
 """
 import os
+from functools import lru_cache
 from dotenv import load_dotenv
 
 load_dotenv()
 
 
+@lru_cache(maxsize=1)
+def get_http_client():
+    """
+    Shared pooled HTTP/2 client for OpenAI and Groq requests
+    
+    Reusing one client keeps TLS connections alive across chats and between
+    the embedding and LLM calls instead of each model opening its own pool.
+    """
+    import httpx
+    return httpx.Client(
+        http2=True,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50)
+    )
+
+
+@lru_cache(maxsize=1)
 def get_llm_provider():
-    """Get the configured LLM provider from environment"""
+    """Get the configured LLM provider from environment (read once per process)"""
     return os.getenv("LLM_PROVIDER", "openai").lower()
 
 
 def get_embeddings():
     """Initialize embeddings based on configured provider"""
-    provider = get_llm_provider()
-    
+    return _load_embeddings(get_llm_provider())
+
+
+@lru_cache(maxsize=1)
+def _load_embeddings(provider):
+    """Load the embedding model once per provider and reuse it"""
     if provider == "gemini" or provider == "google":
         from langchain_google_genai import GoogleGenerativeAIEmbeddings
         api_key = os.getenv("GOOGLE_API_KEY")
@@ -34,24 +55,36 @@ def get_embeddings():
     
     elif provider == "groq":
         # Groq doesn't provide embeddings, use HuggingFace (free, local)
-        from langchain_huggingface import HuggingFaceEmbeddings
-        model = os.getenv("HF_EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
-        return HuggingFaceEmbeddings(model_name=model)
+        return _huggingface_embeddings()
     
     elif provider == "huggingface" or provider == "hf":
-        from langchain_huggingface import HuggingFaceEmbeddings
-        model = os.getenv("HF_EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
-        return HuggingFaceEmbeddings(model_name=model)
+        return _huggingface_embeddings()
     
     else:  # default to openai
         from langchain_openai import OpenAIEmbeddings
-        return OpenAIEmbeddings(model="text-embedding-3-small")
+        return OpenAIEmbeddings(model="text-embedding-3-small", http_client=get_http_client())
+
+
+def _huggingface_embeddings():
+    """Local sentence-transformers embeddings, encoded in large batches"""
+    import torch
+    from langchain_huggingface import HuggingFaceEmbeddings
+    model = os.getenv("HF_EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+    return HuggingFaceEmbeddings(
+        model_name=model,
+        model_kwargs={"device": "cuda" if torch.cuda.is_available() else "cpu"},
+        encode_kwargs={"batch_size": 64, "normalize_embeddings": True}
+    )
 
 
 def get_llm(temperature=0.7):
     """Initialize LLM based on configured provider"""
-    provider = get_llm_provider()
-    
+    return _load_llm(get_llm_provider(), temperature)
+
+
+@lru_cache(maxsize=8)
+def _load_llm(provider, temperature):
+    """Build the chat model once per provider and temperature and reuse it"""
     if provider == "gemini" or provider == "google":
         from langchain_google_genai import ChatGoogleGenerativeAI
         api_key = os.getenv("GOOGLE_API_KEY")
@@ -77,7 +110,8 @@ def get_llm(temperature=0.7):
         return ChatGroq(
             groq_api_key=api_key,
             model_name=model,
-            temperature=temperature
+            temperature=temperature,
+            http_client=get_http_client()
         )
     
     elif provider == "huggingface" or provider == "hf":
@@ -94,60 +128,59 @@ def get_llm(temperature=0.7):
     
     else:  # default to openai
         from langchain_openai import ChatOpenAI
-        return ChatOpenAI(model="gpt-4o", temperature=temperature)
+        return ChatOpenAI(model="gpt-4o", temperature=temperature, http_client=get_http_client())
 
 
-def get_provider_info():
-    """Get information about the current provider"""
-    provider = get_llm_provider()
-    
-    info = {
-        "openai": {
-            "name": "OpenAI",
-            "models": {"llm": "gpt-4o", "embeddings": "text-embedding-3-small"},
-            "cost": "Paid",
-            "requires": ["OPENAI_API_KEY"]
-        },
-        "gemini": {
-            "name": "Google Gemini",
-            "models": {"llm": "gemini-pro", "embeddings": "embedding-001"},
-            "cost": "Free tier available",
-            "requires": ["GOOGLE_API_KEY"]
+# Provider descriptions served by /provider-info, built once at import
+_PROVIDER_INFO = {
+    "openai": {
+        "name": "OpenAI",
+        "models": {"llm": "gpt-4o", "embeddings": "text-embedding-3-small"},
+        "cost": "Paid",
+        "requires": ["OPENAI_API_KEY"]
+    },
+    "gemini": {
+        "name": "Google Gemini",
+        "models": {"llm": "gemini-pro", "embeddings": "embedding-001"},
+        "cost": "Free tier available",
+        "requires": ["GOOGLE_API_KEY"]
+    },
+    "google": {
+        "name": "Google Gemini",
+        "models": {"llm": "gemini-pro", "embeddings": "embedding-001"},
+        "cost": "Free tier available",
+        "requires": ["GOOGLE_API_KEY"]
+    },
+    "ollama": {
+        "name": "Ollama (Local)",
+        "models": {
+            "llm": os.getenv("OLLAMA_MODEL", "llama2"),
+            "embeddings": os.getenv("OLLAMA_EMBED_MODEL", "nomic-embed-text")
         },
-        "google": {
-            "name": "Google Gemini",
-            "models": {"llm": "gemini-pro", "embeddings": "embedding-001"},
-            "cost": "Free tier available",
-            "requires": ["GOOGLE_API_KEY"]
+        "cost": "100% Free (Local)",
+        "requires": ["Ollama installed locally"]
+    },
+    "groq": {
+        "name": "Groq",
+        "models": {
+            "llm": os.getenv("GROQ_MODEL", "mixtral-8x7b-32768"),
+            "embeddings": "N/A (use with HuggingFace embeddings)"
         },
-        "ollama": {
-            "name": "Ollama (Local)",
-            "models": {
-                "llm": os.getenv("OLLAMA_MODEL", "llama2"),
-                "embeddings": os.getenv("OLLAMA_EMBED_MODEL", "nomic-embed-text")
-            },
-            "cost": "100% Free (Local)",
-            "requires": ["Ollama installed locally"]
+        "cost": "Free tier available",
+        "requires": ["GROQ_API_KEY"]
+    },
+    "huggingface": {
+        "name": "Hugging Face",
+        "models": {
+            "llm": os.getenv("HF_MODEL", "mistralai/Mistral-7B-Instruct-v0.2"),
+            "embeddings": os.getenv("HF_EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
         },
-        "groq": {
-            "name": "Groq",
-            "models": {
-                "llm": os.getenv("GROQ_MODEL", "mixtral-8x7b-32768"),
-                "embeddings": "N/A (use with HuggingFace embeddings)"
-            },
-            "cost": "Free tier available",
-            "requires": ["GROQ_API_KEY"]
-        },
-        "huggingface": {
-            "name": "Hugging Face",
-            "models": {
-                "llm": os.getenv("HF_MODEL", "mistralai/Mistral-7B-Instruct-v0.2"),
-                "embeddings": os.getenv("HF_EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
-            },
-            "cost": "Free tier available",
-            "requires": ["HUGGINGFACE_API_KEY"]
-        }
+        "cost": "Free tier available",
+        "requires": ["HUGGINGFACE_API_KEY"]
     }
-    
-    return info.get(provider, info["openai"])
+}
+
 
+def get_provider_info():
+    """Get information about the current provider"""
+    return _PROVIDER_INFO.get(get_llm_provider(), _PROVIDER_INFO["openai"])
@@ -0,0 +1,36 @@
+"""
+PDF Text Extraction Module
+PDFium page extraction, shared by the PDF processor and its worker processes
+
+Extraction workers import only this module (and pypdfium2), so keep it free
+of the app's heavier imports.
+"""
+import threading
+from typing import List
+import pypdfium2 as pdfium
+
+# PDFium is not thread-safe, even across documents; every PDFium call made in
+# this process (uploads run on a thread pool) must hold this lock
+PDFIUM_LOCK = threading.Lock()
+
+
+def read_page_text(pdf, page_index: int) -> str:
+    """Extract the text of one page from an open PDFium document (hold PDFIUM_LOCK)"""
+    page = pdf[page_index]
+    textpage = page.get_textpage()
+    try:
+        return textpage.get_text_range().replace("\r\n", "\n")
+    finally:
+        textpage.close()
+        page.close()
+
+
+def extract_page_range(args) -> List[str]:
+    """Process pool worker: extract text from pages [start, stop) of a PDF"""
+    pdf_file_path, start, stop = args
+    with PDFIUM_LOCK:
+        pdf = pdfium.PdfDocument(pdf_file_path)
+        try:
+            return [read_page_text(pdf, i) for i in range(start, stop)]
+        finally:
+            pdf.close()
@@ -2,44 +2,226 @@
 PDF Processing Module
 Handles PDF text extraction, chunking, and vector store operations
 """
+import hashlib
+import multiprocessing
 import os
-from typing import List, Dict, Any
-try:
-    from pypdf import PdfReader
-except ImportError:
-    from PyPDF2 import PdfReader
+import re
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+import numpy as np
+import pypdfium2 as pdfium
 from langchain_core.documents import Document
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_chroma import Chroma
 from dotenv import load_dotenv
 from llm_config import get_embeddings
+from pdf_extract import PDFIUM_LOCK, extract_page_range, read_page_text
+from vectorstore_config import COLLECTION_METADATA, bump_corpus_generation, get_client_settings
 
 load_dotenv()
 
+# Upper bound on records per Chroma add() call (below SQLite's variable limit)
+CHROMA_ADD_BATCH_SIZE = 4096
+
+# Chunks are embedded and written to Chroma in batches of this size
+EMBED_BATCH_SIZE = 256
+
+# PDFs with at least this many pages are extracted across a process pool
+PARALLEL_EXTRACT_MIN_PAGES = 32
+
+# Shared by all uploads, so concurrent uploads never exceed cpu_count() workers
+EXTRACT_WORKERS = os.cpu_count() or 1
+_extract_pool = None
+_extract_pool_lock = threading.Lock()
+
+
+def _file_digest(file_path: str) -> str:
+    """Content hash of a file, read in 1 MB blocks"""
+    digest = hashlib.blake2b()
+    with open(file_path, "rb") as file:
+        while block := file.read(1024 * 1024):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Preferred chunk boundaries, strongest first
+_CHUNK_SEPARATORS = ("\n\n", "\n", " ")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _chunk_spans(text: str, chunk_size: int, chunk_overlap: int) -> List[Tuple[int, int]]:
+    """
+    Compute (start, end) offsets of overlapping chunks in a single pass
+    
+    Each chunk ends at the last paragraph, line or word break that keeps it
+    at least half full (or is cut at chunk_size if there is none), and the
+    next chunk starts on a word boundary about chunk_overlap characters back.
+    """
+    spans = []
+    text_length = len(text)
+    match = _WHITESPACE_RE.match(text)
+    start = match.end() if match else 0
+    
+    while start < text_length:
+        end = start + chunk_size
+        if end >= text_length:
+            end = text_length
+        else:
+            for separator in _CHUNK_SEPARATORS:
+                cut = text.rfind(separator, start + chunk_size // 2, end)
+                if cut != -1:
+                    end = cut
+                    break
+        spans.append((start, end))
+        if end >= text_length:
+            break
+        
+        # Step back for the overlap, then skip to the start of the next word
+        overlap_start = max(end - chunk_overlap, start + 1)
+        match = _WHITESPACE_RE.search(text, overlap_start, end)
+        start = match.end() if match else overlap_start
+        match = _WHITESPACE_RE.match(text, start)
+        if match:
+            start = match.end()
+    
+    return spans
+
+
+class _EmbeddingCacheWriter:
+    """
+    Streams chunk texts and embeddings to temporary files batch by batch and
+    packs them into the cache .npz once the whole PDF has been stored
+    
+    The .npz holds float32 "embeddings", the UTF-8 bytes of all chunk texts
+    as "text", and chunk boundaries within them as "offsets".
+    """
+    
+    def __init__(self, cache_path: str):
+        self.cache_path = cache_path
+        cache_directory = os.path.dirname(cache_path)
+        os.makedirs(cache_directory, exist_ok=True)
+        self._embeddings_file = tempfile.NamedTemporaryFile(dir=cache_directory, suffix=".emb", delete=False)
+        self._text_file = tempfile.NamedTemporaryFile(dir=cache_directory, suffix=".txt", delete=False)
+        self._offsets = [0]
+        self._dimensions = 0
+        self._failed = False
+    
+    def append(self, texts: List[str], embeddings: List[List[float]]):
+        """Write one batch of chunk texts and their embeddings"""
+        if self._failed:
+            return
+        try:
+            batch = np.asarray(embeddings, dtype=np.float32)
+            self._dimensions = batch.shape[1]
+            batch.tofile(self._embeddings_file)
+            for text in texts:
+                encoded = text.encode("utf-8")
+                self._text_file.write(encoded)
+                self._offsets.append(self._offsets[-1] + len(encoded))
+        except OSError as e:
+            # The cache is optional; stop writing it but keep ingesting
+            print(f"Error writing embedding cache: {str(e)}")
+            self._failed = True
+    
+    def commit(self):
+        """Pack the temporary files into the cache file (atomically)"""
+        try:
+            if self._failed:
+                return
+            self._embeddings_file.close()
+            self._text_file.close()
+            
+            # Memory-mapped, so np.savez copies them to the archive in pieces
+            embeddings = np.memmap(
+                self._embeddings_file.name, dtype=np.float32, mode="r",
+                shape=(len(self._offsets) - 1, self._dimensions)
+            )
+            text = np.memmap(self._text_file.name, dtype=np.uint8, mode="r")
+            
+            temp_path = f"{self.cache_path}.tmp"
+            with open(temp_path, "wb") as file:
+                np.savez(file, embeddings=embeddings, text=text, offsets=np.asarray(self._offsets, dtype=np.int64))
+            del embeddings, text
+            os.replace(temp_path, self.cache_path)
+        finally:
+            self.discard()
+    
+    def discard(self):
+        """Close and delete the temporary files"""
+        for temp_file in (self._embeddings_file, self._text_file):
+            temp_file.close()
+            if os.path.exists(temp_file.name):
+                os.remove(temp_file.name)
+
+
+def _get_extract_pool() -> ProcessPoolExecutor:
+    """
+    Get the process-wide page extraction pool, starting it on first use
+    
+    Workers are started with forkserver (or spawn) rather than fork, so they
+    never inherit locks held by other threads of the server. The fork server
+    preloads only pdf_extract instead of the default __main__ (app.py).
+    """
+    global _extract_pool
+    with _extract_pool_lock:
+        if _extract_pool is None:
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context("forkserver")
+                context.set_forkserver_preload(["pdf_extract"])
+            else:
+                context = multiprocessing.get_context("spawn")
+            _extract_pool = ProcessPoolExecutor(
+                max_workers=EXTRACT_WORKERS,
+                mp_context=context
+            )
+        return _extract_pool
+
+
+def _reset_extract_pool():
+    """Discard a broken extraction pool"""
+    global _extract_pool
+    with _extract_pool_lock:
+        if _extract_pool is not None:
+            _extract_pool.shutdown(wait=False)
+            _extract_pool = None
+
 
 class PDFProcessor:
-    def __init__(self, persist_directory: str = "db/chroma_db"):
+    def __init__(self, persist_directory: str = "db/chroma_db", cache_directory: str = "db/embed_cache"):
         """Initialize PDF processor with vector store configuration"""
         self.persist_directory = persist_directory
+        self.cache_directory = cache_directory
         self.embedding_model = get_embeddings()
         self.vectorstore = None  # Don't load existing store, create fresh when needed
+        
+        # Content hashes of PDFs currently being ingested
+        self._ingesting = set()
+        self._ingesting_lock = threading.Lock()
     
-    def _get_or_create_vectorstore(self):
-        """Get existing vectorstore or create new one"""
+    def _open_vectorstore(self) -> Chroma:
+        """Open (or create) the persisted Chroma collection"""
+        return Chroma(
+            persist_directory=self.persist_directory,
+            embedding_function=self.embedding_model,
+            collection_metadata=COLLECTION_METADATA,
+            client_settings=get_client_settings(self.persist_directory)
+        )
+    
+    def _get_or_create_vectorstore(self, create: bool = False):
+        """Get existing vectorstore, or create a new one when create is True"""
         if self.vectorstore is None:
-            if os.path.exists(self.persist_directory):
+            if create or os.path.exists(self.persist_directory):
                 try:
-                    self.vectorstore = Chroma(
-                        persist_directory=self.persist_directory,
-                        embedding_function=self.embedding_model,
-                        collection_metadata={"hnsw:space": "cosine"}
-                    )
+                    self.vectorstore = self._open_vectorstore()
                 except Exception as e:
                     # If loading fails, remove the directory and create fresh
                     import shutil
                     if os.path.exists(self.persist_directory):
                         shutil.rmtree(self.persist_directory)
-                    self.vectorstore = None
+                    self.vectorstore = self._open_vectorstore() if create else None
         return self.vectorstore
     
     def extract_text_from_pdf(self, pdf_file_path: str) -> str:
@@ -56,31 +238,59 @@ class PDFProcessor:
             Exception: If PDF cannot be read or is corrupted
         """
         try:
-            text = ""
-            with open(pdf_file_path, 'rb') as file:
-                pdf_reader = PdfReader(file)
-                
-                # Check if PDF is encrypted
-                if pdf_reader.is_encrypted:
-                    raise Exception("PDF is encrypted and cannot be processed")
-                
-                # Extract text from all pages
-                for page_num, page in enumerate(pdf_reader.pages):
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += f"\n--- Page {page_num + 1} ---\n{page_text}"
-                
-                if not text.strip():
-                    raise Exception("No text could be extracted from the PDF")
+            page_texts = None
+            with PDFIUM_LOCK:
+                try:
+                    pdf = pdfium.PdfDocument(pdf_file_path)
+                except pdfium.PdfiumError as e:
+                    # PDFium refuses to open encrypted PDFs without a password
+                    raise Exception(f"PDF is encrypted or corrupted and cannot be processed ({e})")
                 
-                return text
+                try:
+                    n_pages = len(pdf)
+                    if n_pages < PARALLEL_EXTRACT_MIN_PAGES or EXTRACT_WORKERS == 1:
+                        # Small PDFs: process startup would cost more than it saves
+                        page_texts = [read_page_text(pdf, i) for i in range(n_pages)]
+                finally:
+                    pdf.close()
+            
+            if page_texts is None:
+                # Pages are independent, so extract them in parallel. Each worker
+                # gets one contiguous span and opens the document once, so
+                # PDFium's document-level font/CMap caches are reused across
+                # all of its pages rather than rebuilt per small task.
+                span = -(-n_pages // EXTRACT_WORKERS)
+                tasks = [
+                    (pdf_file_path, start, min(start + span, n_pages))
+                    for start in range(0, n_pages, span)
+                ]
+                try:
+                    page_texts = [
+                        page_text
+                        for range_texts in _get_extract_pool().map(extract_page_range, tasks)
+                        for page_text in range_texts
+                    ]
+                except BrokenProcessPool:
+                    # A worker died; start a fresh pool for the next upload
+                    _reset_extract_pool()
+                    raise
+            
+            # Check per page rather than stripping a copy of the joined text
+            if not any(page_text and not page_text.isspace() for page_text in page_texts):
+                raise Exception("No text could be extracted from the PDF")
+            
+            return "".join(
+                f"\n--- Page {page_num + 1} ---\n{page_text}"
+                for page_num, page_text in enumerate(page_texts)
+                if page_text
+            )
         
         except Exception as e:
             raise Exception(f"Error extracting text from PDF: {str(e)}")
     
-    def chunk_text(self, text: str, pdf_filename: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> List[Document]:
+    def iter_chunks(self, text: str, pdf_filename: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> Iterator[Document]:
         """
-        Split text into chunks with metadata
+        Split text into chunks and yield them one at a time with metadata
         
         Args:
             text: Text to be chunked
@@ -88,76 +298,234 @@ class PDFProcessor:
             chunk_size: Maximum size of each chunk
             chunk_overlap: Number of characters to overlap between chunks
             
-        Returns:
-            List of Document objects with chunked text and metadata
+        Yields:
+            Document objects with chunked text and metadata
         """
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            length_function=len,
-            separators=["\n\n", "\n", " ", ""]
-        )
-        
-        # Split text into chunks
-        chunks = text_splitter.split_text(text)
+        # Only chunk offsets are materialized; chunk strings are sliced lazily
+        spans = _chunk_spans(text, chunk_size, chunk_overlap)
         
-        # Create Document objects with metadata
-        documents = [
-            Document(
-                page_content=chunk,
+        total_chunks = len(spans)
+        for i, (start, end) in enumerate(spans):
+            yield Document(
+                page_content=text[start:end].rstrip(),
                 metadata={
                     "source": pdf_filename,
                     "chunk_index": i,
-                    "total_chunks": len(chunks)
+                    "total_chunks": total_chunks
                 }
             )
-            for i, chunk in enumerate(chunks)
-        ]
+    
+    def chunk_text(self, text: str, pdf_filename: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> List[Document]:
+        """
+        Split text into chunks with metadata
         
-        return documents
+        Args:
+            text: Text to be chunked
+            pdf_filename: Name of the source PDF file
+            chunk_size: Maximum size of each chunk
+            chunk_overlap: Number of characters to overlap between chunks
+            
+        Returns:
+            List of Document objects with chunked text and metadata
+        """
+        return list(self.iter_chunks(text, pdf_filename, chunk_size, chunk_overlap))
     
-    def store_chunks_in_vectordb(self, chunks: List[Document]) -> Dict[str, Any]:
+    def _add_embedded_chunks(self, vectorstore: Chroma, chunks: List[Document], embeddings: List[List[float]]):
+        """Write pre-embedded chunks to the Chroma collection in bounded batches"""
+        for start in range(0, len(chunks), CHROMA_ADD_BATCH_SIZE):
+            batch = chunks[start:start + CHROMA_ADD_BATCH_SIZE]
+            batch_embeddings = embeddings[start:start + CHROMA_ADD_BATCH_SIZE]
+            if isinstance(batch_embeddings, np.ndarray):
+                batch_embeddings = batch_embeddings.tolist()
+            vectorstore._collection.add(
+                ids=[str(uuid.uuid4()) for _ in batch],
+                embeddings=batch_embeddings,
+                documents=[chunk.page_content for chunk in batch],
+                metadatas=[chunk.metadata for chunk in batch]
+            )
+    
+    def _embed_and_add(self, vectorstore: Chroma, chunks: List[Document], cache: Optional[_EmbeddingCacheWriter] = None) -> int:
         """
-        Embed chunks and store in ChromaDB
+        Embed a batch of chunks in one call and write it straight to the collection
+        
+        If cache is given, the batch is also streamed to the embedding cache.
+        """
+        texts = [chunk.page_content for chunk in chunks]
+        embeddings = self.embedding_model.embed_documents(texts)
+        self._add_embedded_chunks(vectorstore, chunks, embeddings)
+        if cache is not None:
+            cache.append(texts, embeddings)
+        return len(chunks)
+    
+    def _embedding_cache_path(self, content_hash: str) -> str:
+        """Cache file for a PDF's chunks, specific to the current embedding model"""
+        model_name = getattr(self.embedding_model, "model", None) or getattr(self.embedding_model, "model_name", "")
+        model_key = hashlib.blake2b(
+            f"{type(self.embedding_model).__name__}:{model_name}".encode(), digest_size=8
+        ).hexdigest()
+        return os.path.join(self.cache_directory, f"{content_hash}-{model_key}.npz")
+    
+    def store_chunks_in_vectordb(self, chunks: Iterable[Document], content_hash: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Embed chunks and store in ChromaDB, EMBED_BATCH_SIZE chunks at a time
         
         Args:
-            chunks: List of Document objects to store
+            chunks: Document objects to store (a list or a generator)
+            content_hash: Hash of the source PDF; when given, chunks are tagged
+                with it and their embeddings are saved to the embedding cache
             
         Returns:
             Dictionary with storage status information
         """
+        vectorstore = None
+        cache = None
         try:
-            vectorstore = self._get_or_create_vectorstore()
-            
+            vectorstore = self._get_or_create_vectorstore(create=True)
             if vectorstore is None:
-                # Create new vector store
-                self.vectorstore = Chroma.from_documents(
-                    documents=chunks,
-                    embedding=self.embedding_model,
-                    persist_directory=self.persist_directory,
-                    collection_metadata={"hnsw:space": "cosine"}
-                )
-            else:
-                # Add to existing vector store
-                self.vectorstore.add_documents(chunks)
+                raise Exception("Vector store could not be opened")
+            
+            if content_hash is not None:
+                try:
+                    cache = _EmbeddingCacheWriter(self._embedding_cache_path(content_hash))
+                except OSError as e:
+                    print(f"Error creating embedding cache: {str(e)}")
+            chunks_added = 0
+            batch = []
+            for chunk in chunks:
+                if content_hash is not None:
+                    chunk.metadata["content_hash"] = content_hash
+                batch.append(chunk)
+                if len(batch) >= EMBED_BATCH_SIZE:
+                    chunks_added += self._embed_and_add(vectorstore, batch, cache)
+                    batch = []
+            if batch:
+                chunks_added += self._embed_and_add(vectorstore, batch, cache)
+            
+            if cache is not None:
+                # The chunks are stored either way; a cache write failure only logs
+                try:
+                    if chunks_added:
+                        cache.commit()
+                    else:
+                        cache.discard()
+                except Exception as e:
+                    print(f"Error writing embedding cache: {str(e)}")
+                cache = None
+            
+            if chunks_added:
+                bump_corpus_generation()
             
             # Get total count
-            total_docs = self.vectorstore._collection.count()
+            total_docs = vectorstore._collection.count()
             
             return {
                 "success": True,
-                "chunks_added": len(chunks),
+                "chunks_added": chunks_added,
                 "total_documents": total_docs,
-                "message": f"Successfully stored {len(chunks)} chunks in vector database"
+                "message": f"Successfully stored {chunks_added} chunks in vector database"
             }
         
         except Exception as e:
+            if cache is not None:
+                cache.discard()
+            
+            # Don't leave a half-indexed PDF behind to be reported as indexed
+            if content_hash is not None and vectorstore is not None:
+                self._delete_pdf_chunks(vectorstore, content_hash)
             return {
                 "success": False,
                 "error": str(e),
                 "message": f"Error storing chunks in vector database: {str(e)}"
             }
     
+    def _delete_pdf_chunks(self, vectorstore: Chroma, content_hash: str):
+        """Remove every chunk stored for a PDF's content hash"""
+        try:
+            vectorstore._collection.delete(where={"content_hash": content_hash})
+        except Exception as e:
+            print(f"Error removing partially stored chunks: {str(e)}")
+        finally:
+            bump_corpus_generation()
+    
+    def _find_indexed_pdf(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        """
+        Check whether a PDF with this content hash is fully stored in the vector store
+        
+        Incomplete leftovers (e.g. from a crash mid-ingest) are deleted so the
+        PDF gets re-ingested. The caller must hold the hash in self._ingesting,
+        so the chunks of an ingest still in progress are never mistaken for
+        leftovers.
+        """
+        vectorstore = self._get_or_create_vectorstore()
+        if vectorstore is None:
+            return None
+        
+        existing = vectorstore._collection.get(
+            where={"content_hash": content_hash},
+            include=["metadatas"]
+        )
+        if not existing["ids"]:
+            return None
+        
+        total_chunks = existing["metadatas"][0].get("total_chunks", 0)
+        if len(existing["ids"]) != total_chunks:
+            self._delete_pdf_chunks(vectorstore, content_hash)
+            return None
+        
+        return {
+            "total_chunks": total_chunks,
+            "total_documents": vectorstore._collection.count()
+        }
+    
+    def _store_cached_chunks(self, cache_path: str, pdf_filename: str, content_hash: str) -> Dict[str, Any]:
+        """Store a PDF's chunks from the embedding cache, skipping extraction and embedding"""
+        vectorstore = None
+        try:
+            vectorstore = self._get_or_create_vectorstore(create=True)
+            if vectorstore is None:
+                raise Exception("Vector store could not be opened")
+            
+            with np.load(cache_path) as cached:
+                text = cached["text"].tobytes()
+                offsets = cached["offsets"].tolist()
+                embeddings = cached["embeddings"]
+            documents = [
+                text[start:end].decode("utf-8")
+                for start, end in zip(offsets[:-1], offsets[1:])
+            ]
+            del text
+            
+            total_chunks = len(documents)
+            chunks = [
+                Document(
+                    page_content=content,
+                    metadata={
+                        "source": pdf_filename,
+                        "chunk_index": i,
+                        "total_chunks": total_chunks,
+                        "content_hash": content_hash
+                    }
+                )
+                for i, content in enumerate(documents)
+            ]
+            self._add_embedded_chunks(vectorstore, chunks, embeddings)
+            bump_corpus_generation()
+            
+            return {
+                "success": True,
+                "chunks_added": total_chunks,
+                "total_documents": vectorstore._collection.count()
+            }
+        
+        except Exception as e:
+            if vectorstore is not None:
+                self._delete_pdf_chunks(vectorstore, content_hash)
+            return {
+                "success": False,
+                "error": str(e),
+                "message": f"Error storing cached chunks: {str(e)}"
+            }
+    
     def process_pdf(self, pdf_file_path: str, pdf_filename: str) -> Dict[str, Any]:
         """
         Complete pipeline: extract, chunk, and store PDF
@@ -170,21 +538,75 @@ class PDFProcessor:
             Dictionary with processing results
         """
         try:
+            # Step 0: Reuse earlier work for byte-identical PDFs
+            content_hash = _file_digest(pdf_file_path)
+            
+            # Only one ingest per content hash at a time
+            with self._ingesting_lock:
+                if content_hash in self._ingesting:
+                    return {
+                        "success": False,
+                        "error": "PDF is already being indexed",
+                        "message": f"{pdf_filename} is already being indexed, try again shortly"
+                    }
+                self._ingesting.add(content_hash)
+            try:
+                return self._process_new_pdf(pdf_file_path, pdf_filename, content_hash)
+            finally:
+                with self._ingesting_lock:
+                    self._ingesting.discard(content_hash)
+        
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "message": f"Error processing PDF: {str(e)}"
+            }
+    
+    def _process_new_pdf(self, pdf_file_path: str, pdf_filename: str, content_hash: str) -> Dict[str, Any]:
+        """Index a PDF whose content hash the caller holds in self._ingesting"""
+        try:
+            indexed = self._find_indexed_pdf(content_hash)
+            if indexed is not None:
+                return {
+                    "success": True,
+                    "filename": pdf_filename,
+                    "chunks_created": indexed["total_chunks"],
+                    "chunks_stored": 0,
+                    "total_documents": indexed["total_documents"],
+                    "message": f"{pdf_filename} is already indexed"
+                }
+            
+            cache_path = self._embedding_cache_path(content_hash)
+            if os.path.exists(cache_path):
+                result = self._store_cached_chunks(cache_path, pdf_filename, content_hash)
+                if result["success"]:
+                    return {
+                        "success": True,
+                        "filename": pdf_filename,
+                        "chunks_created": result["chunks_added"],
+                        "chunks_stored": result["chunks_added"],
+                        "total_documents": result["total_documents"],
+                        "message": f"Successfully processed {pdf_filename} (cached embeddings)"
+                    }
+            
             # Step 1: Extract text
             text = self.extract_text_from_pdf(pdf_file_path)
+            text_length = len(text)
             
-            # Step 2: Chunk text
-            chunks = self.chunk_text(text, pdf_filename)
+            # Step 2: Chunk text lazily; the generator holds the text from here
+            chunks = self.iter_chunks(text, pdf_filename)
+            del text
             
-            # Step 3: Store in vector database
-            result = self.store_chunks_in_vectordb(chunks)
+            # Step 3: Embed and store in vector database batch by batch
+            result = self.store_chunks_in_vectordb(chunks, content_hash=content_hash)
             
             if result["success"]:
                 return {
                     "success": True,
                     "filename": pdf_filename,
-                    "text_length": len(text),
-                    "chunks_created": len(chunks),
+                    "text_length": text_length,
+                    "chunks_created": result["chunks_added"],
                     "chunks_stored": result["chunks_added"],
                     "total_documents": result["total_documents"],
                     "message": f"Successfully processed {pdf_filename}"
@@ -224,67 +646,29 @@ class PDFProcessor:
                 "message": f"Error getting vector store status: {str(e)}"
             }
     
+    def _clear_embedding_cache(self):
+        """Delete every cached PDF embedding file"""
+        if not os.path.isdir(self.cache_directory):
+            return
+        # Only finished .npz files; temp files of a running ingest stay put
+        for entry in os.scandir(self.cache_directory):
+            if entry.name.endswith(".npz"):
+                os.remove(entry.path)
+    
     def clear_vectorstore(self) -> Dict[str, Any]:
-        """Clear all documents from the vector store"""
+        """Clear all documents from the vector store and the embedding cache"""
         try:
-            # Close and delete the vectorstore properly
-            if self.vectorstore is not None:
-                try:
-                    # Try to delete the collection first
-                    self.vectorstore.delete_collection()
-                except:
-                    pass  # Ignore errors if collection doesn't exist
-                
-                # Clear the reference
-                self.vectorstore = None
-            
-            # Force garbage collection to release file handles
-            import gc
-            gc.collect()
-            
-            # Wait a moment for file handles to be released
-            import time
-            time.sleep(0.5)
+            vectorstore = self._get_or_create_vectorstore()
+            if vectorstore is not None:
+                # Let Chroma drop its collections and segment files itself
+                vectorstore._client.reset()
             
-            # Remove persist directory completely
-            if os.path.exists(self.persist_directory):
-                import shutil
-                try:
-                    # Try multiple times with increasing delays
-                    for attempt in range(3):
-                        try:
-                            shutil.rmtree(self.persist_directory)
-                            break
-                        except Exception as e:
-                            if attempt < 2:
-                                time.sleep(0.5)
-                                gc.collect()
-                            else:
-                                # Last resort: remove files individually
-                                import glob
-                                for file_path in glob.glob(os.path.join(self.persist_directory, "**/*"), recursive=True):
-                                    try:
-                                        if os.path.isfile(file_path):
-                                            os.chmod(file_path, 0o777)
-                                            os.remove(file_path)
-                                    except:
-                                        pass
-                                # Try to remove directory one last time
-                                try:
-                                    shutil.rmtree(self.persist_directory)
-                                except:
-                                    pass
-                except:
-                    pass
+            # Clear the reference; the next upload reopens the store
+            self.vectorstore = None
+            bump_corpus_generation()
             
-            # Reset ChromaDB client cache (important!)
-            try:
-                import chromadb
-                # Clear any cached clients
-                if hasattr(chromadb, '_client_cache'):
-                    chromadb._client_cache.clear()
-            except:
-                pass
+            # Cached embeddings only live as long as the documents they belong to
+            self._clear_embedding_cache()
             
             return {
                 "success": True,
@@ -296,4 +680,3 @@ class PDFProcessor:
                 "error": str(e),
                 "message": f"Error clearing vector store: {str(e)}"
             }
-
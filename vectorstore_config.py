@@ -0,0 +1,66 @@
+"""
+Vector Store Configuration Module
+Shared Chroma collection settings for the PDF processor and chat engine
+"""
+import os
+import threading
+from chromadb.config import Settings
+
+# HNSW index parameters (only applied when the collection is first created)
+COLLECTION_METADATA = {
+    "hnsw:space": "cosine",
+    "hnsw:construction_ef": 128,
+    "hnsw:M": 24,
+    "hnsw:search_ef": 100,
+    "hnsw:num_threads": os.cpu_count() or 1,
+}
+
+
+# Bumped by the PDF processor whenever the stored documents change, so
+# in-memory copies of the collection know when to rebuild
+_corpus_generation = 0
+_corpus_generation_lock = threading.Lock()
+
+
+def get_corpus_generation() -> int:
+    """Current generation of the stored documents"""
+    return _corpus_generation
+
+
+def bump_corpus_generation():
+    """Mark the stored documents as changed"""
+    global _corpus_generation
+    with _corpus_generation_lock:
+        _corpus_generation += 1
+
+
+def get_client_settings(persist_directory: str) -> Settings:
+    """
+    Settings for the persistent Chroma client
+    
+    Every handle on the same directory must use identical settings, since
+    Chroma shares one client per path within a process.
+    """
+    return Settings(
+        is_persistent=True,
+        persist_directory=persist_directory,
+        anonymized_telemetry=False,
+        allow_reset=True
+    )
+
+
+def prefetch_index_files(persist_directory: str):
+    """Ask the OS to page in the persisted SQLite and HNSW files ahead of the first query"""
+    if not hasattr(os, "posix_fadvise"):
+        return
+    
+    for root, _, files in os.walk(persist_directory):
+        for name in files:
+            try:
+                fd = os.open(os.path.join(root, name), os.O_RDONLY)
+                try:
+                    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+                finally:
+                    os.close(fd)
+            except OSError:
+                pass  # Prefetching is only a hint